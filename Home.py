@@ -1,8 +1,9 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
 from fpdf import FPDF
 
+from faura_core import check_password, currency_input, calculate_metrics, build_profit_fig, fmt_money, metric_card, metric_row
+
 # --- 1. PAGE CONFIGURATION (Must be first) ---
 st.set_page_config(page_title="Faura ROI Calculator", layout="wide")
 
@@ -33,26 +34,6 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- 2. STANDARDIZED LOGIN BLOCK ---
-def check_password():
-    """Returns `True` if the user had the correct password."""
-    if st.session_state.get("password_correct", False):
-        return True
-
-    st.title("🔒 Faura Risk Calculator")
-    
-    with st.form("login_form"):
-        st.write("Please enter the access code to view the calculator.")
-        password = st.text_input("Password", type="password")
-        submitted = st.form_submit_button("Log In")
-        
-        if submitted:
-            if password == "Faura2026":
-                st.session_state["password_correct"] = True
-                st.rerun()
-            else:
-                st.error("😕 Password incorrect")
-    return False
-
 if not check_password():
     st.stop()
 
@@ -91,8 +72,8 @@ def create_pdf_report(client_name, metrics, inputs):
     row_height = 8
 
     pdf.cell(col_width, row_height, f"Homes: {inputs['n_homes']}", border=1)
-    pdf.cell(col_width, row_height, f"Avg Premium: ${inputs['avg_premium']:,.0f}", border=1)
-    pdf.cell(col_width, row_height, f"Avg TIV: ${inputs['avg_tiv']:,.0f}", border=1)
+    pdf.cell(col_width, row_height, f"Avg Premium: {fmt_money(inputs['avg_premium'])}", border=1)
+    pdf.cell(col_width, row_height, f"Avg TIV: {fmt_money(inputs['avg_tiv'])}", border=1)
     pdf.cell(col_width, row_height, f"Incident Prob: {inputs['incident_prob']*100:.1f}%", border=1, new_x="LMARGIN", new_y="NEXT")
     
     pdf.cell(col_width, row_height, f"Expense Ratio: {inputs['expense_ratio']*100:.1f}%", border=1)
@@ -135,7 +116,7 @@ def create_pdf_report(client_name, metrics, inputs):
     else:
         pdf.set_text_color(0, 0, 0)
 
-    pdf.cell(95, 10, f"{sign}${profit_delta:,.0f}", border=0, align='R', new_x="LMARGIN", new_y="NEXT")
+    pdf.cell(95, 10, f"{sign}{fmt_money(profit_delta)}", border=0, align='R', new_x="LMARGIN", new_y="NEXT")
     pdf.set_text_color(0, 0, 0)
 
     pdf.ln(5)
@@ -165,8 +146,8 @@ def create_pdf_report(client_name, metrics, inputs):
             
         diff = faura_val - sq_val
         pdf.cell(w_item, 8, label, 1, 0, 'L', fill=True)
-        pdf.cell(w_num, 8, f"${sq_val:,.0f}", 1, 0, 'R', fill=True)
-        pdf.cell(w_num, 8, f"${faura_val:,.0f}", 1, 0, 'R', fill=True)
+        pdf.cell(w_num, 8, fmt_money(sq_val), 1, 0, 'R', fill=True)
+        pdf.cell(w_num, 8, fmt_money(faura_val), 1, 0, 'R', fill=True)
         
         pdf.set_text_color(0, 0, 0)
         if diff > 0:
@@ -176,7 +157,7 @@ def create_pdf_report(client_name, metrics, inputs):
             if inverse_color: pdf.set_text_color(0, 128, 0)
             else:             pdf.set_text_color(200, 0, 0)
         
-        pdf.cell(w_num, 8, f"${diff:,.0f}", 1, 1, 'R', fill=True)
+        pdf.cell(w_num, 8, fmt_money(diff), 1, 1, 'R', fill=True)
         pdf.set_text_color(0, 0, 0)
 
     add_row("Gross Written Premium", metrics['total_premium'], metrics['total_premium'])
@@ -198,79 +179,45 @@ def create_pdf_report(client_name, metrics, inputs):
 # --- 4. CALCULATOR INPUTS ---
 st.title("Faura Underwriting Profit Calculator")
 
-def currency_input(label, default_value, tooltip=None):
-    user_input = st.sidebar.text_input(label, value=f"${default_value:,.0f}", help=tooltip)
-    try:
-        clean_val = float(user_input.replace('$', '').replace(',', '').strip())
-    except ValueError:
-        clean_val = default_value
-        st.sidebar.error(f"Please enter a valid number for {label}")
-    return clean_val
-
-st.sidebar.header("1. Portfolio Inputs")
-n_homes = st.sidebar.number_input("Number of Homes", value=100, step=1)
-avg_premium = currency_input("Avg Premium per Home", 3000)
-avg_tiv = currency_input("Avg TIV per Home", 500000)
-
-expense_ratio_input = st.sidebar.number_input("Expense Ratio (%)", value=15.0, step=0.1, format="%.2f")
+# One form so edits across several inputs trigger a single rerun on submit
+inputs_form = st.sidebar.form("portfolio_inputs", clear_on_submit=False)
+inputs_form.header("1. Portfolio Inputs")
+n_homes = inputs_form.number_input("Number of Homes", value=100, step=1)
+avg_premium = currency_input("Avg Premium per Home", 3000, container=inputs_form)
+avg_tiv = currency_input("Avg TIV per Home", 500000, container=inputs_form)
+
+expense_ratio_input = inputs_form.number_input("Expense Ratio (%)", value=15.0, step=0.1, format="%.2f")
 expense_ratio = expense_ratio_input / 100
 
-st.sidebar.markdown("---")
-st.sidebar.header("2. Risk Inputs")
-incident_prob_input = st.sidebar.number_input("Annual Incident Probability (%)", value=1.0, step=0.01, format="%.2f")
+inputs_form.markdown("---")
+inputs_form.header("2. Risk Inputs")
+incident_prob_input = inputs_form.number_input("Annual Incident Probability (%)", value=1.0, step=0.01, format="%.2f")
 incident_prob = incident_prob_input / 100
-mdr_unmitigated_input = st.sidebar.number_input("MDR (Unmitigated) %", value=80.0, step=0.1)
+mdr_unmitigated_input = inputs_form.number_input("MDR (Unmitigated) %", value=80.0, step=0.1)
 mdr_unmitigated = mdr_unmitigated_input / 100
-mdr_mitigated_input = st.sidebar.number_input("MDR (Mitigated) %", value=30.0, step=0.1)
+mdr_mitigated_input = inputs_form.number_input("MDR (Mitigated) %", value=30.0, step=0.1)
 mdr_mitigated = mdr_mitigated_input / 100
 
-st.sidebar.markdown("---")
-st.sidebar.header("3. Faura Program Inputs")
-faura_cost = currency_input("Faura Cost per Home", 20)
-conversion_input = st.sidebar.number_input("Conversion Rate (%)", value=20.0, step=1.0)
+inputs_form.markdown("---")
+inputs_form.header("3. Faura Program Inputs")
+faura_cost = currency_input("Faura Cost per Home", 20, container=inputs_form)
+conversion_input = inputs_form.number_input("Conversion Rate (%)", value=20.0, step=1.0)
 conversion_rate = conversion_input / 100
-gift_card = currency_input("Gift Card Incentive", 50)
-premium_discount = currency_input("Premium Discount", 100)
-
-def calculate_metrics():
-    total_premium = n_homes * avg_premium
-    total_uw_expense = total_premium * expense_ratio
-    sq_losses = n_homes * avg_tiv * incident_prob * mdr_unmitigated
-    sq_profit = total_premium - (total_uw_expense + sq_losses)
-    
-    sq_combined_ratio = (sq_losses + total_uw_expense) / total_premium if total_premium > 0 else 0
-
-    n_converted = n_homes * conversion_rate
-    n_unconverted = n_homes * (1 - conversion_rate)
-    faura_loss_unconverted = n_unconverted * avg_tiv * incident_prob * mdr_unmitigated
-    faura_loss_converted = n_converted * avg_tiv * incident_prob * mdr_mitigated
-    faura_total_losses = faura_loss_unconverted + faura_loss_converted
-
-    total_faura_fee = n_homes * faura_cost
-    total_gift_cards = n_converted * gift_card
-    total_discounts = n_converted * premium_discount
-    
-    faura_total_cost = total_uw_expense + faura_total_losses + total_faura_fee + total_gift_cards + total_discounts
-    faura_profit = total_premium - faura_total_cost
-    
-    faura_all_expenses = total_uw_expense + total_faura_fee + total_gift_cards + total_discounts
-    faura_combined_ratio = (faura_total_losses + faura_all_expenses) / total_premium if total_premium > 0 else 0
-
-    return {
-        "sq_profit": sq_profit,
-        "sq_losses": sq_losses,
-        "sq_expenses": total_uw_expense,
-        "sq_combined_ratio": sq_combined_ratio,
-        "faura_profit": faura_profit,
-        "faura_losses": faura_total_losses,
-        "faura_program_cost": total_faura_fee,
-        "faura_incentives": total_gift_cards + total_discounts,
-        "faura_expenses": total_uw_expense,
-        "faura_combined_ratio": faura_combined_ratio,
-        "total_premium": total_premium
-    }
-
-metrics = calculate_metrics()
+gift_card = currency_input("Gift Card Incentive", 50, container=inputs_form)
+premium_discount = currency_input("Premium Discount", 100, container=inputs_form)
+inputs_form.form_submit_button("Recalculate", use_container_width=True)
+
+# Plain tuple compare against the last run skips even the st.cache_data hash when inputs are unchanged
+metrics_key = (
+    n_homes, avg_premium, avg_tiv, expense_ratio, incident_prob, mdr_unmitigated, mdr_mitigated,
+    faura_cost, conversion_rate, gift_card, premium_discount
+)
+if st.session_state.get("_metrics_key") == metrics_key:
+    metrics = st.session_state["_metrics_val"]
+else:
+    metrics = calculate_metrics(*metrics_key)
+    st.session_state["_metrics_key"] = metrics_key
+    st.session_state["_metrics_val"] = metrics
 
 # --- 5. DASHBOARD LAYOUT ---
 col_header, col_btn = st.columns([3, 1], gap="small")
@@ -294,18 +241,9 @@ with col_btn:
 
 
 # --- UPDATED: 6 Columns to include Combined Ratio ---
-c1, c2, c3, c4, c5, c6 = st.columns(6)
-
-with c1: st.metric("Status Quo Profit", f"${metrics['sq_profit']:,.0f}")
-
 profit_diff = metrics['faura_profit'] - metrics['sq_profit']
-with c2: st.metric("With Faura Profit", f"${metrics['faura_profit']:,.0f}", delta=f"${profit_diff:,.0f}")
-
 claims_saved = metrics['sq_losses'] - metrics['faura_losses']
-with c3: st.metric("🛡️ Claims Saved", f"${claims_saved:,.0f}", help="Gross reduction in expected losses.")
-
 total_program_cost = metrics['faura_program_cost'] + metrics['faura_incentives']
-with c4: st.metric("🧾 Total Program Cost", f"${total_program_cost:,.0f}", delta_color="inverse")
 
 net_project_roi_dollars = claims_saved - total_program_cost
 if total_program_cost > 0:
@@ -320,32 +258,42 @@ if total_program_cost > 0:
 else:
     display_delta, delta_color = "N/A", "off"
 
-with c5: st.metric("💰 Net Project ROI ($)", f"${net_project_roi_dollars:,.0f}", delta=display_delta, delta_color=delta_color)
-
 # --- NEW WIDGET: Combined Ratio ---
 cr_improvement = (metrics['faura_combined_ratio'] - metrics['sq_combined_ratio']) * 100
-# delta_color="inverse" means Negative (Improvement) is Green
-with c6: st.metric("📉 Combined Ratio", f"{metrics['faura_combined_ratio']*100:.1f}%", delta=f"{cr_improvement:.1f} pts", delta_color="inverse", help="With Faura (Losses + Expenses) / Premium. Lower is better.")
+
+cards = [
+    metric_card("Status Quo Profit", fmt_money(metrics['sq_profit'])),
+    metric_card("With Faura Profit", fmt_money(metrics['faura_profit']), delta=fmt_money(profit_diff), direction=profit_diff),
+    metric_card("🛡️ Claims Saved", fmt_money(claims_saved), help="Gross reduction in expected losses."),
+    metric_card("🧾 Total Program Cost", fmt_money(total_program_cost)),
+    metric_card("💰 Net Project ROI ($)", fmt_money(net_project_roi_dollars), delta=display_delta, direction=net_project_roi_dollars, delta_color=delta_color),
+    # delta_color="inverse" means Negative (Improvement) is Green
+    metric_card("📉 Combined Ratio", f"{metrics['faura_combined_ratio']*100:.1f}%", delta=f"{cr_improvement:.1f} pts", direction=cr_improvement, delta_color="inverse", help="With Faura (Losses + Expenses) / Premium. Lower is better."),
+]
+metric_row(cards)
 
 st.markdown("---")
 
-fig = go.Figure()
-fig.add_trace(go.Bar(x=['Status Quo'], y=[metrics['sq_profit']], name='Status Quo', text=[f"${metrics['sq_profit']:,.0f}"], textposition='auto', marker_color='#EF553B'))
-fig.add_trace(go.Bar(x=['With Faura'], y=[metrics['faura_profit']], name='With Faura', text=[f"${metrics['faura_profit']:,.0f}"], textposition='auto', marker_color='#4B604D'))
-fig.update_layout(title="Net Underwriting Profit Comparison", height=500)
-st.plotly_chart(fig, use_container_width=True)
+fig = build_profit_fig(metrics['sq_profit'], metrics['faura_profit'])
+st.plotly_chart(fig, use_container_width=True, key="profit_bar")
 
 st.subheader("Financial Breakdown")
-table_data = {
-    "Line Item": ["Gross Written Premium", "(-) Underwriting Expenses", "(-) Expected Incident Losses", "(-) Faura Program Fees", "(-) Incentives (Cards + Discounts)", "= NET PROFIT"],
-    "Status Quo": [metrics['total_premium'], -metrics['sq_expenses'], -metrics['sq_losses'], 0, 0, metrics['sq_profit']],
-    "With Faura": [metrics['total_premium'], -metrics['faura_expenses'], -metrics['faura_losses'], -metrics['faura_program_cost'], -metrics['faura_incentives'], metrics['faura_profit']]
-}
-df = pd.DataFrame(table_data)
-def fmt(x): return f"${x:,.0f}"
-df["Status Quo"], df["With Faura"] = df["Status Quo"].apply(fmt), df["With Faura"].apply(fmt)
-def highlight_total(row): return ['font-weight: bold; background-color: #f0f2f6; color: black'] * len(row) if row.name == 5 else [''] * len(row)
-st.table(df.style.apply(highlight_total, axis=1))
+line_items = ["Gross Written Premium", "(-) Underwriting Expenses", "(-) Expected Incident Losses", "(-) Faura Program Fees", "(-) Incentives (Cards + Discounts)", "= NET PROFIT"]
+sq_vals = [metrics['total_premium'], -metrics['sq_expenses'], -metrics['sq_losses'], 0, 0, metrics['sq_profit']]
+faura_vals = [metrics['total_premium'], -metrics['faura_expenses'], -metrics['faura_losses'], -metrics['faura_program_cost'], -metrics['faura_incentives'], metrics['faura_profit']]
+breakdown_df = pd.DataFrame({"Line Item": line_items, "Status Quo": sq_vals, "With Faura": faura_vals})
+# Values stay numeric; the Styler only formats them and highlights the total, which is styled as one row
+# rather than through a per-row callback
+st.dataframe(
+    breakdown_df.style
+    .format("${:,.0f}", subset=["Status Quo", "With Faura"])
+    .set_properties(
+        subset=pd.IndexSlice[breakdown_df.index[-1], :],
+        **{"font-weight": "bold", "background-color": "#f0f2f6", "color": "black"}
+    ),
+    hide_index=True,
+    use_container_width=True
+)
 
 st.markdown("---")
 with st.expander("ℹ️ Glossary & Formula Logic"):
@@ -0,0 +1,325 @@
+"""Helpers shared by the Faura Streamlit pages.
+
+Nothing here renders at import time, so pages can import it right after
+`st.set_page_config`.
+"""
+import hashlib
+import hmac
+import html
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+import plotly.graph_objects as go
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+
+# --- LOGIN ---
+# The shared access code is checked against a salted PBKDF2-HMAC-SHA256 hash; neither the code nor
+# any hash of it is committed. A deployment sets all three of these in secrets.toml (or the env):
+#   pwd_hash / FAURA_PW_HASH              hex PBKDF2 output
+#   pwd_salt / FAURA_PW_SALT              hex random salt
+#   pwd_iterations / FAURA_PW_ITERATIONS  e.g. 600000
+# Generate them with:
+#   python -c "import getpass, hashlib, os; salt = os.urandom(16); print(salt.hex(),
+#       hashlib.pbkdf2_hmac('sha256', getpass.getpass().encode(), salt, 600_000).hex())"
+def _login_setting(key, env_var):
+    try:
+        value = st.secrets.get(key)
+    except FileNotFoundError:  # no secrets.toml at all
+        value = None
+    return value or os.environ.get(env_var)
+
+@lru_cache(maxsize=1)
+def _password_kdf():
+    """`(salt, iterations, hash)` for the configured access code, or `None` if any part is unset."""
+    settings = (
+        _login_setting("pwd_salt", "FAURA_PW_SALT"),
+        _login_setting("pwd_iterations", "FAURA_PW_ITERATIONS"),
+        _login_setting("pwd_hash", "FAURA_PW_HASH"),
+    )
+    if not all(settings):
+        return None
+    salt, iterations, digest = settings
+    return bytes.fromhex(salt), int(iterations), bytes.fromhex(digest)
+
+def password_ok(password):
+    """Constant-time check of `password` against the configured PBKDF2 hash; fails closed."""
+    kdf = _password_kdf()
+    if kdf is None:
+        return False
+    salt, iterations, expected = kdf
+    actual = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations, dklen=len(expected))
+    return hmac.compare_digest(actual, expected)
+
+def check_password(title="🔒 Faura Risk Calculator", prompt="Please enter the access code to view the calculator."):
+    """Returns `True` if the user had the correct password."""
+    if st.session_state.get("password_correct", False):
+        return True
+
+    st.title(title)
+    if _password_kdf() is None:
+        st.error("🔒 No access code is configured for this deployment. Set `pwd_hash`, `pwd_salt` and `pwd_iterations` in secrets.toml.")
+        return False
+    
+    with st.form("login_form"):
+        st.write(prompt)
+        password = st.text_input("Password", type="password")
+        submitted = st.form_submit_button("Log In")
+        
+        if submitted:
+            if password_ok(password):
+                st.session_state["password_correct"] = True
+                st.rerun()
+            else:
+                st.error("😕 Password incorrect")
+    return False
+
+
+# --- FORMATTING ---
+@lru_cache(maxsize=512)
+def fmt_money(x):
+    """Whole-dollar display string, e.g. `$1,234`. Memoized since reruns repeat the same values."""
+    return f"${x:,.0f}"
+
+
+# --- INPUT HELPERS ---
+def currency_input(label, default_value, tooltip=None, container=st.sidebar):
+    """Whole-dollar input. A typed number_input, so the browser validates it and no text parsing runs on rerun."""
+    return container.number_input(label, value=int(default_value), min_value=0, step=1, format="%d", help=tooltip)
+
+
+# --- CALCULATIONS ---
+@st.cache_data(max_entries=128)
+def calculate_metrics(n_homes, avg_premium, avg_tiv, expense_ratio, incident_prob, mdr_unmitigated, mdr_mitigated,
+                      faura_cost, conversion_rate, gift_card, premium_discount):
+    """Pure metric math; cached on the scalar inputs so unrelated reruns skip it."""
+    total_premium = n_homes * avg_premium
+    total_uw_expense = total_premium * expense_ratio
+    # Expected loss per home before damage ratio; shared by every loss line below
+    exposure = avg_tiv * incident_prob
+    sq_losses = n_homes * exposure * mdr_unmitigated
+    sq_profit = total_premium - (total_uw_expense + sq_losses)
+    
+    sq_combined_ratio = (sq_losses + total_uw_expense) / total_premium if total_premium > 0 else 0
+
+    n_converted = n_homes * conversion_rate
+    # Converted homes drop from the unmitigated to the mitigated MDR; the rest stay put
+    faura_total_losses = n_homes * exposure * (mdr_unmitigated - conversion_rate * (mdr_unmitigated - mdr_mitigated))
+
+    total_faura_fee = n_homes * faura_cost
+    total_gift_cards = n_converted * gift_card
+    total_discounts = n_converted * premium_discount
+    
+    faura_total_cost = total_uw_expense + faura_total_losses + total_faura_fee + total_gift_cards + total_discounts
+    faura_profit = total_premium - faura_total_cost
+    
+    faura_all_expenses = total_uw_expense + total_faura_fee + total_gift_cards + total_discounts
+    faura_combined_ratio = (faura_total_losses + faura_all_expenses) / total_premium if total_premium > 0 else 0
+
+    return {
+        "sq_profit": sq_profit,
+        "sq_losses": sq_losses,
+        "sq_expenses": total_uw_expense,
+        "sq_combined_ratio": sq_combined_ratio,
+        "faura_profit": faura_profit,
+        "faura_losses": faura_total_losses,
+        "faura_program_cost": total_faura_fee,
+        "faura_incentives": total_gift_cards + total_discounts,
+        "faura_expenses": total_uw_expense,
+        "faura_combined_ratio": faura_combined_ratio,
+        "total_premium": total_premium
+    }
+
+
+# --- DATA ---
+# Deletes "$" and "," without going through the regex engine
+_CURRENCY_TRANSLATE = str.maketrans('', '', '$,')
+
+def to_numeric_columns(df, cols):
+    """Parses whichever of `cols` are in `df` as numbers, in place, and returns `df`.
+
+    Sheet cells like "$1,234" lose their "$" and "," first; anything unparseable becomes NaN.
+    Columns come back as float32 (about 7 significant digits), which is ample for whole-dollar
+    amounts, years and probabilities; cents on values over ~$100K are rounded off.
+    """
+    for col in cols:
+        s = df.get(col)
+        if s is None:
+            continue
+        if not pd.api.types.is_numeric_dtype(s):
+            # Only text columns take the string round trip; numeric ones are just narrowed
+            s = s.astype(str).str.translate(_CURRENCY_TRANSLATE)
+        # An explicit cast: to_numeric(downcast='float') keeps float64 whenever narrowing would round
+        df[col] = pd.to_numeric(s, errors='coerce').astype(np.float32)
+    return df
+
+@st.cache_resource
+def get_conn():
+    """The app's one Google Sheets connection, shared by every page, session and data TTL expiry.
+
+    Kept alive so the authenticated client is reused instead of re-doing auth on each page's load.
+    """
+    # Imported here so pages that never touch Sheets don't need the connector installed
+    from streamlit_gsheets import GSheetsConnection
+    return st.connection("gsheets", type=GSheetsConnection)
+
+def read_worksheets(conn, spreadsheet, worksheets):
+    """Reads several tabs of one Google Sheet concurrently; returns DataFrames in `worksheets` order.
+
+    `worksheets` maps each tab name to extra `conn.read` options for it (e.g. `usecols`).
+    Each `conn.read` is its own Sheets round-trip, so a cold load waits on the slowest tab
+    rather than the sum of all of them.
+    """
+    ctx = get_script_run_ctx()
+
+    def read(item):
+        worksheet, options = item
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return conn.read(spreadsheet=spreadsheet, worksheet=worksheet, **options)
+
+    with ThreadPoolExecutor(max_workers=len(worksheets)) as pool:
+        return list(pool.map(read, worksheets.items()))
+
+# Shared by every worker process on the host, unlike st.cache_data which lives in one process.
+# It holds client addresses and policy data, so it is private to the app's user.
+_DISK_CACHE_DIR = os.path.join(tempfile.gettempdir(), "faura_cache")
+
+def ttl_window(max_age):
+    """Index of the current `max_age`-second window.
+
+    Pass it to a cached loader instead of `ttl=` so the in-process copy expires at the same
+    moment as the disk copy from `disk_cached_frames`, and data is never more than `max_age` old.
+    """
+    return int(time.time() // max_age)
+
+def _private_cache_dir():
+    os.makedirs(_DISK_CACHE_DIR, mode=0o700, exist_ok=True)
+    # Also tightens a directory left with default permissions; fails if another user owns it
+    os.chmod(_DISK_CACHE_DIR, 0o700)
+
+def disk_cached_frames(name, parts, max_age, load, source=()):
+    """Returns the DataFrames from `load()`, one per entry in `parts`, via a Parquet copy on disk.
+
+    Copies written in the current `ttl_window(max_age)` are read back instead of calling `load`,
+    so a fresh process skips the Google Sheets fetch and cleanup. `source` describes what `load`
+    reads (spreadsheet, tabs, columns); its hash is part of the file names, so changing it never
+    serves a copy written for the old one.
+    """
+    digest = hashlib.sha256(repr(source).encode()).hexdigest()[:16]
+    paths = [os.path.join(_DISK_CACHE_DIR, f"{name}_{digest}_{part}.parquet") for part in parts]
+    window = ttl_window(max_age)
+    try:
+        _private_cache_dir()
+        if all(os.path.getmtime(path) // max_age == window for path in paths):
+            return tuple(pd.read_parquet(path) for path in paths)
+    except (OSError, ValueError, pa.ArrowException):
+        pass  # Missing, partial or unreadable copy: fall through to a real load
+
+    frames = load()
+    try:
+        _private_cache_dir()
+        for frame, path in zip(frames, paths):
+            # Written aside (owner-only) and renamed so another process never reads a half-written file
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                frame.to_parquet(f)
+            os.replace(tmp_path, path)
+    except (OSError, ValueError, pa.ArrowException):
+        pass  # e.g. a mixed-type sheet column Arrow can't store; the in-process cache still applies
+    return frames
+
+
+# --- SELECTION ---
+def top_k_indices(values, k):
+    """Positions of the `k` largest `values`, largest first; NaNs rank last like `sort_values`.
+
+    `argpartition` finds the top block in O(N) and only that block gets sorted.
+    """
+    values = np.asarray(values)
+    k = min(k, len(values))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    neg = -values
+    top = np.argpartition(neg, k - 1)[:k]
+    return top[np.argsort(neg[top], kind="stable")]
+
+
+# --- METRIC CARDS ---
+# A row of KPI cards rendered inline as one HTML block instead of one st.metric round-trip each.
+# Text colors inherit from the app theme, and the grid wraps on narrow screens.
+_CARD_GRID_HTML = """<style>
+.faura-kpis {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(150px, 1fr)); gap: 16px; }}
+.faura-kpis .label {{ font-size: 14px; opacity: 0.6; }}
+.faura-kpis .value {{ font-size: 32px; font-weight: 400; line-height: 1.4; }}
+.faura-kpis .delta {{ font-size: 14px; }}
+</style>
+<div class="faura-kpis">{cards}</div>"""
+_CARD_HTML = '<div title="{help}"><div class="label">{label}</div><div class="value"{style}>{value}</div>{delta}</div>'
+_DELTA_STYLES = {"good": "color: #09ab3b;", "bad": "color: #ff2b2b;", "off": "opacity: 0.6;"}
+
+def metric_card(label, value, delta=None, direction=0, delta_color="normal", help="", value_color=None):
+    """`direction` is the sign of the underlying change; `delta_color` follows st.metric semantics.
+
+    A zero `direction` renders a grey delta with no arrow, and cards without a delta keep an empty
+    delta line, so every card in a row has the same height.
+    """
+    if delta is None:
+        delta_html = '<div class="delta">&nbsp;</div>'
+    else:
+        if delta_color == "off" or direction == 0:
+            # No change: neutral grey, as st.metric shows it
+            tone, arrow = "off", ""
+        else:
+            good = (direction > 0) == (delta_color == "normal")
+            tone, arrow = ("good" if good else "bad"), ("↑ " if direction > 0 else "↓ ")
+        delta_html = f'<div class="delta" style="{_DELTA_STYLES[tone]}">{arrow}{html.escape(str(delta))}</div>'
+    style = f' style="color: {value_color};"' if value_color else ""
+    return _CARD_HTML.format(
+        label=html.escape(str(label)), value=html.escape(str(value)), style=style, delta=delta_html,
+        help=html.escape(str(help))
+    )
+
+def metric_row(cards):
+    """Renders `metric_card` strings side by side in a single inline HTML block."""
+    st.html(_CARD_GRID_HTML.format(cards="".join(cards)))
+
+
+# --- CHARTS ---
+@st.cache_resource
+def _profit_layout():
+    # Validated once; each figure copies it on construction
+    return go.Layout(title="Net Underwriting Profit Comparison", height=500)
+
+@st.cache_resource(max_entries=128)
+def build_profit_fig(sq_profit, faura_profit):
+    fig = go.Figure(layout=_profit_layout())
+    fig.add_trace(go.Bar(x=['Status Quo'], y=[sq_profit], name='Status Quo', text=[fmt_money(sq_profit)], textposition='auto', marker_color='#EF553B'))
+    fig.add_trace(go.Bar(x=['With Faura'], y=[faura_profit], name='With Faura', text=[fmt_money(faura_profit)], textposition='auto', marker_color='#4B604D'))
+    return fig
+
+@st.cache_data(max_entries=64)
+def histogram_bins(values, nbins):
+    """`(counts, edges)` of the finite `values`; keyed on content, so reruns that don't touch the data skip the binning."""
+    values = np.asarray(values)
+    if values.dtype.kind != "f":
+        values = values.astype(np.float64)  # float32 sheet columns are binned as-is, without an upcast copy
+    return np.histogram(values[np.isfinite(values)], bins=nbins)
+
+def histogram_fig(values, nbins, title, color):
+    """Bar chart of `values` binned server-side, so only `nbins` bars go to the browser.
+
+    Drop-in for `px.histogram(df, x=col, nbins=nbins)`; NaNs are skipped the same way.
+    """
+    counts, edges = histogram_bins(values, nbins)
+    fig = go.Figure(go.Bar(x=0.5 * (edges[:-1] + edges[1:]), y=counts, width=np.diff(edges), marker_color=color))
+    fig.update_layout(title=title, bargap=0)
+    return fig
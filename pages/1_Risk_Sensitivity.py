@@ -3,27 +3,13 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go # <--- This was the missing import
 
+from faura_core import check_password
+
 # --- PAGE CONFIGURATION ---
 st.set_page_config(page_title="Risk Sensitivity Analysis", layout="wide")
 
 # --- LOGIN BLOCK ---
-def check_password():
-    if st.session_state.get("password_correct", False):
-        return True
-    
-    st.title("🔒 Faura Portfolio Map")
-    with st.form("login_form"):
-        st.write("Please enter the access code to view the map.")
-        password = st.text_input("Password", type="password")
-        if st.form_submit_button("Log In"):
-            if password == "Faura2026":
-                st.session_state["password_correct"] = True
-                st.rerun()
-            else:
-                st.error("😕 Password incorrect")
-    return False
-
-if not check_password():
+if not check_password("🔒 Faura Portfolio Map", "Please enter the access code to view the map."):
     st.stop()
 
 # --- MAIN CONTENT ---
@@ -31,6 +17,9 @@ st.title("Risk Sensitivity Analysis")
 st.markdown("### Adjust Risk & Program Performance")
 
 # --- HELPER FUNCTION FOR CURRENCY INPUTS ---
+# Strips "$", "," and spaces in a single pass
+_CURRENCY_TRANSLATE = str.maketrans('', '', '$, ')
+
 def currency_input(label, default_value, tooltip=None):
     user_input = st.sidebar.text_input(
         label, 
@@ -38,7 +27,7 @@ def currency_input(label, default_value, tooltip=None):
         help=tooltip
     )
     try:
-        clean_val = float(user_input.replace('$', '').replace(',', '').strip())
+        clean_val = float(user_input.translate(_CURRENCY_TRANSLATE))
     except ValueError:
         clean_val = default_value
     return clean_val
@@ -76,8 +65,12 @@ with col4:
     conversion_input = st.slider("Conversion Rate (%)", 0.0, 100.0, 20.0, 1.0, format="%.0f%%")
     conversion_rate = conversion_input / 100
 
+# --- PER-HOME EXPECTED LOSS (shared by breakeven text, metrics and footer) ---
+loss_rate_unmit = avg_tiv * current_Incident_prob * mdr_unmitigated
+loss_rate_mit = avg_tiv * current_Incident_prob * mdr_mitigated
+
 # --- BREAKEVEN ANALYSIS (TEXT) ---
-loss_reduction_per_converted_home = (avg_tiv * current_Incident_prob * mdr_unmitigated) - (avg_tiv * current_Incident_prob * mdr_mitigated)
+loss_reduction_per_converted_home = loss_rate_unmit - loss_rate_mit
 total_incentives_per_converted_home = gift_card + premium_discount
 net_benefit_per_conversion = loss_reduction_per_converted_home - total_incentives_per_converted_home
 total_portfolio_savings = loss_reduction_per_converted_home * n_homes * conversion_rate
@@ -97,20 +90,19 @@ else:
         )
 
 # --- CALCULATION LOGIC ---
-def calculate_metrics():
+@st.cache_data(max_entries=128)
+def calculate_metrics(n_homes, avg_premium, expense_ratio, loss_rate_unmit, loss_rate_mit,
+                      conversion_rate, faura_cost, gift_card, premium_discount):
     total_premium = n_homes * avg_premium
     total_uw_expense = total_premium * expense_ratio
 
     # Status Quo
-    sq_losses = n_homes * avg_tiv * current_Incident_prob * mdr_unmitigated
+    sq_losses = n_homes * loss_rate_unmit
     sq_profit = total_premium - (total_uw_expense + sq_losses)
 
     # Faura Scenario
     n_converted = n_homes * conversion_rate
-    n_unconverted = n_homes * (1 - conversion_rate)
-
-    faura_loss = (n_unconverted * avg_tiv * current_Incident_prob * mdr_unmitigated) + \
-                 (n_converted * avg_tiv * current_Incident_prob * mdr_mitigated)
+    faura_loss = n_homes * (loss_rate_unmit - conversion_rate * (loss_rate_unmit - loss_rate_mit))
 
     total_faura_fee = n_homes * faura_cost
     total_incentives = n_converted * (gift_card + premium_discount)
@@ -119,60 +111,118 @@ def calculate_metrics():
 
     return {"sq_profit": sq_profit, "faura_profit": faura_profit}
 
-metrics = calculate_metrics()
+metrics = calculate_metrics(
+    n_homes, avg_premium, expense_ratio, loss_rate_unmit, loss_rate_mit,
+    conversion_rate, faura_cost, gift_card, premium_discount
+)
 
 # --- BAR CHART GENERATION (UPDATED) ---
-fig = go.Figure()
-
-x_labels = ['Status Quo', 'With Faura']
-y_values = [metrics['sq_profit'], metrics['faura_profit']]
-colors = ['#EF553B', '#4B604D'] 
-
-fig.add_trace(go.Bar(
-    x=x_labels,
-    y=y_values,
-    marker_color=colors,
-    text=[f"${val:,.0f}" for val in y_values],
-    textposition='outside',             
-    textfont=dict(size=22, color='#333333'), 
-    cliponaxis=False                    
-))
-
-# Annotations
-delta = metrics['faura_profit'] - metrics['sq_profit']
-text_color = "green" if delta > 0 else "red"
-sign = "+" if delta > 0 else ""
-
-max_val = max(max(y_values), 0)
-min_val = min(min(y_values), 0)
-range_buffer = (max_val - min_val) * 0.2 if max_val != min_val else max_val * 0.2
-
-fig.add_annotation(
-    x=1, 
-    y=metrics['faura_profit'],
-    text=f"<b>{sign}${delta:,.0f}</b>",
-    showarrow=True,
-    arrowhead=2,
-    ax=0,
-    ay=-60,
-    font=dict(size=24, color=text_color)
-)
+# Static layouts are validated by Plotly once and reused; figures copy them on construction
+@st.cache_resource
+def _profit_layout():
+    return go.Layout(
+        title=dict(text="Net Profit Comparison", font=dict(size=24)),
+        yaxis=dict(
+            title="Net Profit ($)", 
+            title_font=dict(size=18)
+        ),
+        xaxis=dict(tickfont=dict(size=18)),
+        template="plotly_white",
+        height=500,
+        showlegend=False,
+        margin=dict(t=80) 
+    )
+
+@st.cache_resource(max_entries=128)
+def build_profit_fig(sq_profit, faura_profit):
+    fig = go.Figure(layout=_profit_layout())
+
+    x_labels = ['Status Quo', 'With Faura']
+    y_values = [sq_profit, faura_profit]
+    colors = ['#EF553B', '#4B604D'] 
+
+    fig.add_trace(go.Bar(
+        x=x_labels,
+        y=y_values,
+        marker_color=colors,
+        text=[f"${val:,.0f}" for val in y_values],
+        textposition='outside',             
+        textfont=dict(size=22, color='#333333'), 
+        cliponaxis=False                    
+    ))
+
+    # Annotations
+    delta = faura_profit - sq_profit
+    text_color = "green" if delta > 0 else "red"
+    sign = "+" if delta > 0 else ""
+
+    max_val = max(max(y_values), 0)
+    min_val = min(min(y_values), 0)
+    range_buffer = (max_val - min_val) * 0.2 if max_val != min_val else max_val * 0.2
+
+    fig.add_annotation(
+        x=1, 
+        y=faura_profit,
+        text=f"<b>{sign}${delta:,.0f}</b>",
+        showarrow=True,
+        arrowhead=2,
+        ax=0,
+        ay=-60,
+        font=dict(size=24, color=text_color)
+    )
 
-fig.update_layout(
-    title=dict(text="Net Profit Comparison", font=dict(size=24)),
-    yaxis=dict(
-        title="Net Profit ($)", 
-        title_font=dict(size=18),
-        range=[min_val - (range_buffer/2), max_val + range_buffer] 
-    ),
-    xaxis=dict(tickfont=dict(size=18)),
-    template="plotly_white",
-    height=500,
-    showlegend=False,
-    margin=dict(t=80) 
+    fig.update_layout(yaxis_range=[min_val - (range_buffer/2), max_val + range_buffer])
+    return fig
+
+fig = build_profit_fig(metrics['sq_profit'], metrics['faura_profit'])
+st.plotly_chart(fig, use_container_width=True, key="profit_bar")
+
+# --- SENSITIVITY GRID (INCIDENT PROBABILITY x CONVERSION) ---
+@st.cache_data(max_entries=64)
+def sensitivity_grid(n_homes, avg_premium, avg_tiv, expense_ratio, mdr_unmitigated, mdr_mitigated,
+                     faura_cost, gift_card, premium_discount):
+    # Same algebra as calculate_metrics. Profit splits into a loss term that is an outer
+    # product of (conversion, probability) plus a per-conversion-row offset, so the only
+    # 2-D array allocated is the result, which is then updated in place.
+    p = np.linspace(0.0, 0.05, 51)
+    c = np.linspace(0.0, 1.0, 51)
+    total_premium = n_homes * avg_premium
+    fixed_profit = total_premium - total_premium * expense_ratio - n_homes * faura_cost
+    row_offset = fixed_profit - n_homes * c * (gift_card + premium_discount)
+    mdr_blend = mdr_unmitigated - c * (mdr_unmitigated - mdr_mitigated)
+
+    faura_profit_grid = np.multiply.outer(mdr_blend, p)
+    faura_profit_grid *= -n_homes * avg_tiv
+    faura_profit_grid += row_offset[:, None]
+    return p, c, faura_profit_grid
+
+grid_p, grid_c, faura_profit_grid = sensitivity_grid(
+    n_homes, avg_premium, avg_tiv, expense_ratio, mdr_unmitigated, mdr_mitigated,
+    faura_cost, gift_card, premium_discount
 )
 
-st.plotly_chart(fig, use_container_width=True)
+@st.cache_resource
+def _grid_layout():
+    return go.Layout(
+        title=dict(text="Net Profit With Faura: Incident Probability vs. Conversion", font=dict(size=20)),
+        xaxis=dict(title="Incident Probability (%)"),
+        yaxis=dict(title="Conversion Rate (%)"),
+        template="plotly_white",
+        height=500
+    )
+
+fig_grid = go.Figure(go.Heatmap(
+    x=grid_p * 100,
+    y=grid_c * 100,
+    z=faura_profit_grid,
+    colorscale="RdYlGn",
+    zmid=0,
+    colorbar=dict(title="Net Profit ($)"),
+    hovertemplate="Incident Prob: %{x:.2f}%<br>Conversion: %{y:.0f}%<br>Net Profit: $%{z:,.0f}<extra></extra>"
+), layout=_grid_layout())
+fig_grid.add_vline(x=incident_prob_input, line_dash="dash", line_color="black")
+fig_grid.add_hline(y=conversion_input, line_dash="dash", line_color="black")
+st.plotly_chart(fig_grid, use_container_width=True, key="profit_grid")
 
 # --- EXPLANATION FOOTER ---
 st.markdown("---")
@@ -184,8 +234,7 @@ col_left, col_right = st.columns([1, 1])
 total_incentives = gift_card + premium_discount
 weighted_incentives = total_incentives * conversion_rate
 avg_prog_cost = faura_cost + weighted_incentives
-loss_reduction_per_home = (avg_tiv * current_Incident_prob * mdr_unmitigated) - (avg_tiv * current_Incident_prob * mdr_mitigated)
-weighted_savings = loss_reduction_per_home * conversion_rate
+weighted_savings = loss_reduction_per_converted_home * conversion_rate
 net_result = weighted_savings - avg_prog_cost
 
 with col_left:
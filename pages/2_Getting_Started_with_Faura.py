@@ -1,81 +1,78 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-from streamlit_gsheets import GSheetsConnection
+import plotly.graph_objects as go
+
+from faura_core import (
+    check_password, disk_cached_frames, get_conn, histogram_fig, metric_card, metric_row, read_worksheets,
+    to_numeric_columns, top_k_indices, ttl_window
+)
 
 st.set_page_config(page_title="Getting Started", layout="wide")
 
 # --- 1. SECURITY BLOCK ---
-def check_password():
-    if "password_correct" not in st.session_state:
-        st.session_state["password_correct"] = False
-    
-    def password_entered():
-        if st.session_state["password"] == "Faura2026": 
-            st.session_state["password_correct"] = True
-            del st.session_state["password"]  
-        else:
-            st.session_state["password_correct"] = False
-
-    if not st.session_state["password_correct"]:
-        st.text_input("🔒 Please enter the Faura access code:", type="password", on_change=password_entered, key="password")
-        return False
-    return True
-
-if not check_password():
+if not check_password("🔒 Getting Started", "Please enter the Faura access code:"):
     st.stop()
 
-# --- 2. SIDEBAR CONFIGURATION ---
-with st.sidebar:
-    st.header("⚙️ Pilot Settings")
-    pilot_size = st.number_input("Target Pilot Size (Homes)", min_value=50, value=100, step=10)
-    st.markdown("---")
-    st.info("Adjusting the pilot size highlights the top-risk homes in the charts below.")
-
 # --- 3. DATA LOADING (DUAL TABS) ---
-@st.cache_data(ttl=600)
-def load_data():
+SHEETS_TTL = 600
+SHEET_URL = "https://docs.google.com/spreadsheets/d/1Ank5NAk3qCuYKVK7F580aRU5I2DPDJ6lxLSa66PF33o/edit"
+
+# Every Scored column the page reads; the rest are dropped right after the read
+SCORED_COLS = {
+    "Policy_ID", "address", "city", "TIV", "Annual_Premium", "gross_expected_loss",
+    "scaled_QA_wildfire_score", "carrier_net", "P_Ignition", "Primary_Year_Built_PL",
+    "Wildfire_Annual_Probability_PL", "Wildfire_Risk_Grade_PL"
+}
+
+@st.cache_data(max_entries=4)
+def clean_scored(df_scored):
+    # Keyed on the sheet contents: a TTL refetch of an unchanged sheet skips the cleanup below
+    df_scored = df_scored.dropna(subset=["Policy_ID"])
+    
+    # Ensure numeric types for all columns used in analytics
+    # Note: We exclude "Wildfire_Risk_Grade_PL" because it is categorical (A, B, C...)
+    cols_to_clean = [
+        "TIV", "Annual_Premium", "gross_expected_loss", "scaled_QA_wildfire_score", 
+        "carrier_net", "P_Ignition", "Primary_Year_Built_PL", "Wildfire_Annual_Probability_PL"
+    ]
+    
+    # Remove currency symbols ($ ,) and convert to float32, all present columns in one pass
+    to_numeric_columns(df_scored, cols_to_clean)
+    return df_scored
+
+def fetch_sheets():
+    conn = get_conn()
+    
+    # 1. RAW Input (Client List) and 2. SCORED Data (Analytics), fetched side by side.
+    # The raw list is shown whole; from Scored only the columns this page uses are kept and cleaned.
+    df_raw, df_scored = read_worksheets(
+        conn,
+        SHEET_URL,
+        {
+            "client screening list": {},
+            "Scored": {},
+        }
+    )
+    # Projected here rather than via usecols: the connector caches on its read options, so they must hash
+    df_scored = df_scored[[c for c in df_scored.columns if c in SCORED_COLS]]
+    return df_raw, clean_scored(df_scored)
+
+@st.cache_data(max_entries=2)
+def load_data(window):
+    # Keyed on the TTL window rather than ttl=, so it expires together with the disk copy
     try:
-        conn = st.connection("gsheets", type=GSheetsConnection)
-        
-        # 1. Load RAW Input (Client List)
-        df_raw = conn.read(
-            spreadsheet="https://docs.google.com/spreadsheets/d/1Ank5NAk3qCuYKVK7F580aRU5I2DPDJ6lxLSa66PF33o/edit",
-            worksheet="client screening list" 
-        )
-        
-        # 2. Load SCORED Data (Analytics)
-        df_scored = conn.read(
-            spreadsheet="https://docs.google.com/spreadsheets/d/1Ank5NAk3qCuYKVK7F580aRU5I2DPDJ6lxLSa66PF33o/edit",
-            worksheet="Scored" 
+        # Cleaned frames are also kept as Parquet on disk, so new workers skip the Sheets round-trip
+        return disk_cached_frames(
+            "getting_started", ["raw", "scored"], SHEETS_TTL, fetch_sheets,
+            source=(SHEET_URL, "client screening list", "Scored", sorted(SCORED_COLS))
         )
-        
-        # --- CLEANUP SCORED DATA ---
-        df_scored = df_scored.dropna(subset=["Policy_ID"])
-        
-        # Ensure numeric types for all columns used in analytics
-        # Note: We exclude "Wildfire_Risk_Grade_PL" because it is categorical (A, B, C...)
-        cols_to_clean = [
-            "TIV", "Annual_Premium", "gross_expected_loss", "scaled_QA_wildfire_score", 
-            "carrier_net", "P_Ignition", "Primary_Year_Built_PL", "Wildfire_Annual_Probability_PL"
-        ]
-        
-        for col in cols_to_clean:
-            if col in df_scored.columns:
-                # Remove currency symbols ($ ,) and convert to numeric
-                df_scored[col] = pd.to_numeric(
-                    df_scored[col].astype(str).str.replace(r'[$,]', '', regex=True), 
-                    errors='coerce'
-                )
-        
-        return df_raw, df_scored
     except Exception as e:
         st.error(f"❌ Connection Error: {e}")
         return pd.DataFrame(), pd.DataFrame()
 
 # Load Data
-df_raw, df = load_data()
+df_raw, df = load_data(ttl_window(SHEETS_TTL))
 
 if df.empty:
     st.warning("⚠️ No Scored data found. Check your 'Scored' tab connection.")
@@ -95,7 +92,9 @@ st.markdown(f"""
 
 # --- 5. CLIENT SCREENING LIST (RAW) ---
 with st.expander("📂 View Client Screening List (Raw Intake)", expanded=False):
-    st.dataframe(df_raw, use_container_width=True)
+    # A collapsed expander still ships its contents, so the table is only sent once asked for
+    if st.checkbox(f"Show raw intake ({total_homes_intake:,} rows)", key="show_raw_intake"):
+        st.dataframe(df_raw, use_container_width=True)
 
 # --- 6. PORTFOLIO ANALYTICS (SCORED) ---
 st.markdown("---")
@@ -105,42 +104,32 @@ st.markdown(f"""
 """)
 
 # A. Metrics Widgets
-c1, c2, c3, c4, c5, c6 = st.columns(6)
-
-total_tiv = df["TIV"].sum()
+# One agg call for the headline totals, reused for the pilot slice below
+SUMMARY_AGG = {
+    "TIV": "sum", "Annual_Premium": "sum", "gross_expected_loss": "sum",
+    "carrier_net": "sum", "scaled_QA_wildfire_score": "mean"
+}
+totals = df.agg(SUMMARY_AGG)
+total_tiv = totals["TIV"]
 total_homes = len(df)
-total_premium = df["Annual_Premium"].sum()
-total_gel = df["gross_expected_loss"].sum()
-net_portfolio = df["carrier_net"].sum()
-avg_resilience = df["scaled_QA_wildfire_score"].mean()
-
-# Standard Metrics
-c1.metric("Total Homes", f"{total_homes:,}")
-c2.metric("Total TIV", f"${total_tiv/1e6:,.0f}M")
-c3.metric("Total Premium", f"${total_premium/1e6:,.2f}M")
-c4.metric("Gross Exp. Loss", f"${total_gel/1e6:,.2f}M")
-
-# CUSTOM COLOR METRIC: EXPECTED NET
-if net_portfolio > 0:
-    net_color = "#00CC96" # Green
-elif net_portfolio < 0:
-    net_color = "#EF553B" # Red
-else:
-    net_color = "inherit"
-
-c5.markdown(f"""
-    <div data-testid="stMetricValue">
-        <label style="font-size: 14px; color: rgba(49, 51, 63, 0.6);">Expected Net</label>
-        <div style="font-size: 32px; font-weight: 600; color: {net_color};">
-            ${net_portfolio/1e6:,.2f}M
-        </div>
-        <div style="font-size: 14px; color: rgba(49, 51, 63, 0.6);">
-            Net Profit
-        </div>
-    </div>
-""", unsafe_allow_html=True)
-
-c6.metric("Avg Resilience Score", f"{avg_resilience:.0f}/100")
+total_premium = totals["Annual_Premium"]
+total_gel = totals["gross_expected_loss"]
+net_portfolio = totals["carrier_net"]
+avg_resilience = totals["scaled_QA_wildfire_score"]
+
+def net_color(net):
+    # Green for profit, red for loss
+    return "#00CC96" if net > 0 else "#EF553B" if net < 0 else None
+
+# All six cards in one inline HTML block rather than six st.metric calls
+metric_row([
+    metric_card("Total Homes", f"{total_homes:,}"),
+    metric_card("Total TIV", f"${total_tiv/1e6:,.0f}M"),
+    metric_card("Total Premium", f"${total_premium/1e6:,.2f}M"),
+    metric_card("Gross Exp. Loss", f"${total_gel/1e6:,.2f}M"),
+    metric_card("Expected Net", f"${net_portfolio/1e6:,.2f}M", delta="Net Profit", delta_color="off", value_color=net_color(net_portfolio)),
+    metric_card("Avg Resilience Score", f"{avg_resilience:.0f}/100"),
+])
 
 # B. Visual Analytics (New 3-Tab Layout)
 st.markdown("---")
@@ -151,13 +140,13 @@ with t1:
     c1, c2 = st.columns(2)
     with c1:
         if "carrier_net" in df.columns:
-            fig_net = px.histogram(df, x="carrier_net", nbins=50, title="Net Profit/Loss Distribution", color_discrete_sequence=["#636EFA"])
+            fig_net = histogram_fig(df["carrier_net"].to_numpy(), 50, "Net Profit/Loss Distribution", "#636EFA")
             fig_net.add_vline(x=0, line_dash="dash", line_color="red", annotation_text="Breakeven")
             fig_net.update_layout(xaxis_title="Net Profit ($)", yaxis_title="Count")
             st.plotly_chart(fig_net, use_container_width=True)
     with c2:
         if "gross_expected_loss" in df.columns:
-            fig_gross = px.histogram(df, x="gross_expected_loss", nbins=50, title="Gross Expected Loss Distribution", color_discrete_sequence=["#EF553B"])
+            fig_gross = histogram_fig(df["gross_expected_loss"].to_numpy(), 50, "Gross Expected Loss Distribution", "#EF553B")
             fig_gross.update_layout(xaxis_title="Gross Loss ($)", yaxis_title="Count")
             st.plotly_chart(fig_gross, use_container_width=True)
 
@@ -166,12 +155,12 @@ with t2:
     c1, c2 = st.columns(2)
     with c1:
         if "Primary_Year_Built_PL" in df.columns:
-            fig_year = px.histogram(df, x="Primary_Year_Built_PL", title="Construction Year", nbins=30, color_discrete_sequence=["teal"])
+            fig_year = histogram_fig(df["Primary_Year_Built_PL"].to_numpy(), 30, "Construction Year", "teal")
             fig_year.update_layout(xaxis_title="Year Built", yaxis_title="Count")
             st.plotly_chart(fig_year, use_container_width=True)
     with c2:
          if "scaled_QA_wildfire_score" in df.columns:
-            fig_score = px.histogram(df, x="scaled_QA_wildfire_score", nbins=20, title="Scaled Resilience Score (0-100)", color_discrete_sequence=["#00CC96"])
+            fig_score = histogram_fig(df["scaled_QA_wildfire_score"].to_numpy(), 20, "Scaled Resilience Score (0-100)", "#00CC96")
             fig_score.add_vline(x=75, line_dash="dot", line_color="black", annotation_text="Target")
             fig_score.update_layout(xaxis_title="Score", yaxis_title="Count")
             st.plotly_chart(fig_score, use_container_width=True)
@@ -181,22 +170,20 @@ with t3:
     c1, c2 = st.columns(2)
     with c1:
         if "Wildfire_Annual_Probability_PL" in df.columns:
-            fig_prob = px.histogram(df, x="Wildfire_Annual_Probability_PL", title="Annual Wildfire Probability", nbins=30, color_discrete_sequence=["firebrick"])
+            fig_prob = histogram_fig(df["Wildfire_Annual_Probability_PL"].to_numpy(), 30, "Annual Wildfire Probability", "firebrick")
             fig_prob.update_layout(xaxis_title="Probability (0-1)", yaxis_title="Count")
             st.plotly_chart(fig_prob, use_container_width=True)
     with c2:
         if "Wildfire_Risk_Grade_PL" in df.columns:
-            category_order = {"Wildfire_Risk_Grade_PL": ["A", "B", "C", "D", "F"]}
-            fig_grade = px.histogram(
-                df, 
-                x="Wildfire_Risk_Grade_PL", 
-                title="Wildfire Risk Grade", 
-                color="Wildfire_Risk_Grade_PL",
-                category_orders=category_order,
-                color_discrete_map={
-                    "A": "green", "B": "lightgreen", "C": "yellow", "D": "orange", "F": "red"
-                }
-            )
+            # Five bars from value_counts rather than one string per home
+            grades = ["A", "B", "C", "D", "F"]
+            grade_counts = df["Wildfire_Risk_Grade_PL"].value_counts().reindex(grades, fill_value=0)
+            fig_grade = go.Figure(go.Bar(
+                x=grades,
+                y=grade_counts.to_numpy(),
+                marker_color=["green", "lightgreen", "yellow", "orange", "red"]
+            ))
+            fig_grade.update_layout(title="Wildfire Risk Grade")
             fig_grade.update_layout(xaxis_title="Grade", yaxis_title="Count")
             st.plotly_chart(fig_grade, use_container_width=True)
 
@@ -205,71 +192,69 @@ with st.expander("📋 View Full Portfolio Metrics", expanded=False):
     show_cols = ["Policy_ID", "address", "city", "TIV", "Annual_Premium", "gross_expected_loss", "scaled_QA_wildfire_score"]
     valid_cols = [c for c in show_cols if c in df.columns]
     
-    st.dataframe(df[valid_cols].style.format({
-        "TIV": "${:,.0f}", 
-        "Annual_Premium": "${:,.0f}", 
-        "gross_expected_loss": "${:,.0f}",
-        "scaled_QA_wildfire_score": "{:.1f}"
-    }), use_container_width=True)
+    # Formatted by the frontend grid, so no Python Styler pass over every row; "dollar" keeps the $ and thousands separators
+    column_config = {
+        "TIV": st.column_config.NumberColumn(format="dollar"),
+        "Annual_Premium": st.column_config.NumberColumn(format="dollar"),
+        "gross_expected_loss": st.column_config.NumberColumn(format="dollar"),
+        "scaled_QA_wildfire_score": st.column_config.NumberColumn(format="%.1f")
+    }
+    st.dataframe(df[valid_cols], use_container_width=True, column_config=column_config)
 
 # --- 7. THE TARGET PILOT (UPDATED) ---
 st.markdown("---")
-st.markdown(f"""
-### 🎯 Step 3. Targeted Outreach: Top {pilot_size} Riskiest Homes"
-**We pick the top {pilot_size} homes with the highest expected loss for targeted outreach**
-""")
 
-# Sort and Slice
-if "gross_expected_loss" in df.columns:
-    df_sorted = df.sort_values("gross_expected_loss", ascending=False).reset_index(drop=True)
-    top_n = df_sorted.head(pilot_size)
+@st.cache_data(max_entries=32)
+def pilot_indices(loss, pilot_size):
+    # argpartition picks the pilot in O(N) and sorts only those rows; repeat sizes hit the cache
+    return top_k_indices(loss, pilot_size)
 
-    # Calculate Stats for Widgets
-    pct_homes = (pilot_size / total_homes) * 100
-    top_n_loss = top_n["gross_expected_loss"].sum()
-    pct_loss = (top_n_loss / total_gel) * 100 if total_gel > 0 else 0
-    
-    # --- PILOT WIDGETS ---
-    p1, p2, p3, p4, p5, p6 = st.columns(6)
-    
-    p_tiv = top_n["TIV"].sum()
-    p_prem = top_n["Annual_Premium"].sum()
-    p_gel = top_n["gross_expected_loss"].sum()
-    p_net = top_n["carrier_net"].sum()
-    p_score = top_n["scaled_QA_wildfire_score"].mean()
-
-    p1.metric("Homes to Target", f"{pilot_size}")
-    p2.metric("Outreach TIV", f"${p_tiv/1e6:,.0f}M")
-    p3.metric("Outreach Premium", f"${p_prem/1e6:,.2f}M")
-    p4.metric("Outreach Gross Exp. Loss", f"${p_gel/1e6:,.2f}M", f"{pct_loss:.1f}% of Loss", delta_color="inverse")
-    
-    # Custom Net Color for Pilot
-    if p_net > 0: p_color = "#00CC96" 
-    elif p_net < 0: p_color = "#EF553B" 
-    else: p_color = "inherit"
-
-    p5.markdown(f"""
-    <div data-testid="stMetricValue">
-        <label style="font-size: 14px; color: rgba(49, 51, 63, 0.6);">Target Net</label>
-        <div style="font-size: 26px; font-weight: 600; color: {p_color};">
-            ${p_net/1e6:,.2f}M
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+# The pilot size control lives inside this fragment, so changing it reruns only the pilot
+# section; the loading, portfolio metrics and charts above are left as they are
+@st.fragment
+def target_pilot(df, total_homes, total_gel):
+    st.subheader("⚙️ Pilot Settings")
+    pilot_size = st.number_input("Target Pilot Size (Homes)", min_value=50, value=100, step=10)
+
+    st.markdown(f"""
+    ### 🎯 Step 3. Targeted Outreach: Top {pilot_size} Riskiest Homes"
+    **We pick the top {pilot_size} homes with the highest expected loss for targeted outreach**
+    """)
+
+    # Sort and Slice
+    if "gross_expected_loss" in df.columns:
+        top_n = df.iloc[pilot_indices(df["gross_expected_loss"].to_numpy(), pilot_size)].reset_index(drop=True)
+
+        # Calculate Stats for Widgets
+        pilot_totals = top_n.agg(SUMMARY_AGG)
+        pct_homes = (pilot_size / total_homes) * 100
+        top_n_loss = pilot_totals["gross_expected_loss"]
+        pct_loss = (top_n_loss / total_gel) * 100 if total_gel > 0 else 0
     
-    p6.metric("Avg Resilience Score", f"{p_score:.0f}/100")
+        # --- PILOT WIDGETS ---
+        p_tiv = pilot_totals["TIV"]
+        p_prem = pilot_totals["Annual_Premium"]
+        p_gel = top_n_loss
+        p_net = pilot_totals["carrier_net"]
+        p_score = pilot_totals["scaled_QA_wildfire_score"]
+
+        metric_row([
+            metric_card("Homes to Target", f"{pilot_size}"),
+            metric_card("Outreach TIV", f"${p_tiv/1e6:,.0f}M"),
+            metric_card("Outreach Premium", f"${p_prem/1e6:,.2f}M"),
+            metric_card("Outreach Gross Exp. Loss", f"${p_gel/1e6:,.2f}M", delta=f"{pct_loss:.1f}% of Loss", direction=pct_loss, delta_color="inverse"),
+            metric_card("Target Net", f"${p_net/1e6:,.2f}M", value_color=net_color(p_net)),
+            metric_card("Avg Resilience Score", f"{p_score:.0f}/100"),
+        ])
 
-    st.markdown("---")
+        st.markdown("---")
     
-    # --- COLLAPSIBLE PILOT TABLE ---
-    with st.expander(f"📋 View Target Pilot List ({pilot_size} Homes)", expanded=True):
-        valid_cols = [c for c in show_cols if c in top_n.columns]
-        st.dataframe(top_n[valid_cols].style.format({
-            "TIV": "${:,.0f}", 
-            "Annual_Premium": "${:,.0f}", 
-            "gross_expected_loss": "${:,.0f}",
-            "scaled_QA_wildfire_score": "{:.1f}"
-        }), use_container_width=True)
+        # --- COLLAPSIBLE PILOT TABLE ---
+        with st.expander(f"📋 View Target Pilot List ({pilot_size} Homes)", expanded=True):
+            valid_cols = [c for c in show_cols if c in top_n.columns]
+            st.dataframe(top_n[valid_cols], use_container_width=True, column_config=column_config)
+
+target_pilot(df, total_homes, total_gel)
 
 # --- 9. FOOTER ---
 #st.markdown("---")
@@ -2,35 +2,20 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from streamlit_gsheets import GSheetsConnection
+
+from faura_core import check_password, get_conn
 
 st.set_page_config(page_title="Campaign Operations", layout="wide")
 
 # --- 1. SECURITY BLOCK ---
-def check_password():
-    if "password_correct" not in st.session_state:
-        st.session_state["password_correct"] = False
-    
-    def password_entered():
-        if st.session_state["password"] == "Faura2026": 
-            st.session_state["password_correct"] = True
-            del st.session_state["password"]  
-        else:
-            st.session_state["password_correct"] = False
-
-    if not st.session_state["password_correct"]:
-        st.text_input("🔒 Please enter the Faura access code:", type="password", on_change=password_entered, key="password")
-        return False
-    return True
-
-if not check_password():
+if not check_password("🔒 Campaign Operations", "Please enter the Faura access code:"):
     st.stop()
 
 # --- 2. DATA LOADING ---
 @st.cache_data(ttl=0) 
 def load_campaign_data():
     try:
-        conn = st.connection("gsheets", type=GSheetsConnection)
+        conn = get_conn()
         df = conn.read(
             spreadsheet="https://docs.google.com/spreadsheets/d/1Ank5NAk3qCuYKVK7F580aRU5I2DPDJ6lxLSa66PF33o/edit?gid=1749003768#gid=1749003768",
             worksheet="Campaign" 
@@ -48,21 +33,48 @@ if raw_df.empty:
     st.stop()
 
 # --- 3. FILTERING ACTIVE CAMPAIGN ---
-df = raw_df.copy()
-if "Campaign_Active" in df.columns:
-    df = df[df["Campaign_Active"].astype(str).str.contains("true", case=False, na=False)]
-else:
+def flag_matrix(frame, cols, pattern):
+    # One str.contains pass over every cell of `cols` -> (rows, cols) bool array.
+    # Arrow-backed strings run the match in pyarrow's kernels rather than a Python loop per cell.
+    # Cast per column first: DataFrame.to_numpy(dtype=str) can pick a too-narrow <U width and truncate cells
+    values = frame[cols].astype(str).to_numpy()
+    hits = pd.Series(values.ravel(), dtype="string[pyarrow]").str.contains(pattern, case=False, na=False)
+    hits = hits.to_numpy(dtype=bool)
+    return hits.reshape(values.shape)
+
+@st.cache_data(max_entries=4)
+def parse_flags(frame, funnel_cols, mitigation_cols):
+    # The sheet's yes/no cells arrive as text; they're parsed to bool arrays once per sheet contents
+    # (the frame itself is left untouched for the inspector and raw download)
+    active = flag_matrix(frame, ["Campaign_Active"], "true")[:, 0]
+    return active, flag_matrix(frame, funnel_cols, "true|1|yes"), flag_matrix(frame, mitigation_cols, "verified")
+
+if "Campaign_Active" not in raw_df.columns:
     st.error("❌ Column 'Campaign_Active' not found.")
     st.stop()
 
+FUNNEL_COLS = ["Opened Email", "Unsubscribed", "Finished Lite PSA form", "Submitted any photos"]
+present_cols = [c for c in FUNNEL_COLS if c in raw_df.columns]
+mitigation_cols = [c for c in raw_df.columns if c.startswith("Mitigated_")]
+active, funnel_hits, mit_hits = parse_flags(raw_df, present_cols, mitigation_cols)
+
+df = raw_df[active]
+funnel_hits, mit_hits = funnel_hits[active], mit_hits[active]
+
 if df.empty:
     st.warning("⚠️ Data loaded, but no active campaign rows found.")
     st.stop()
 
 # --- 4. HELPER FUNCTIONS ---
-def count_true(column_name):
-    if column_name not in df.columns: return 0
-    return df[column_name].astype(str).str.contains("true|1|yes", case=False, na=False).sum()
+@st.cache_data(max_entries=4)
+def answer_counts(frame, cols):
+    # Strip/blank-filter every cell of `cols` in one pass, then count answers per column (most common first).
+    # Keyed on the sheet contents, so reruns on unchanged data skip the melt and string work.
+    long = frame[cols].melt(var_name="column", value_name="answer")
+    # Arrow strings for the strip/lower passes; empty cells become <NA> and are dropped with the blanks
+    answers = long["answer"].astype("string[pyarrow]").str.strip()
+    keep = (answers.str.len() > 0) & ~answers.str.lower().isin(["nan", "none"])
+    return long.assign(answer=answers)[keep.fillna(False)].value_counts(["column", "answer"])
 
 def safe_calc(numerator, denominator):
     if denominator == 0: return 0
@@ -70,18 +82,11 @@ def safe_calc(numerator, denominator):
 
 # --- 5. METRICS ---
 total_sent = len(df)
-opened = count_true("Opened Email")
-unsubscribed = count_true("Unsubscribed")
-lite_completed = count_true("Finished Lite PSA form")
-photos_submitted = count_true("Submitted any photos")
+funnel_counts = dict(zip(present_cols, funnel_hits.sum(axis=0)))
+opened, unsubscribed, lite_completed, photos_submitted = (int(funnel_counts.get(c, 0)) for c in FUNNEL_COLS)
 
 # Mitigation Counts
-mitigation_cols = [c for c in df.columns if c.startswith("Mitigated_")]
-if mitigation_cols:
-    mit_df = df[mitigation_cols].astype(str).apply(lambda x: x.str.contains("verified", case=False, na=False))
-    mitigated_count = mit_df.any(axis=1).sum()
-else:
-    mitigated_count = 0
+mitigated_count = int(mit_hits.any(axis=1).sum()) if mitigation_cols else 0
 
 # Calculations for Export
 open_yield = safe_calc(opened, total_sent)
@@ -127,7 +132,7 @@ with col_funnel:
 with col_details:
     st.subheader("🏆 Top Verified Fixes")
     if mitigation_cols:
-        mit_counts = df[mitigation_cols].astype(str).apply(lambda x: x.str.contains("verified", case=False, na=False).sum())
+        mit_counts = pd.Series(mit_hits.sum(axis=0), index=mitigation_cols)
         mit_counts = mit_counts[mit_counts > 0].sort_values(ascending=True)
         if not mit_counts.empty:
             mit_counts.index = [x.replace("Mitigated_", "").replace("_", " ") for x in mit_counts.index]
@@ -147,14 +152,13 @@ color_map_lite = {"Yes": "#00CC96", "No": "#EF553B", "Unsure": "#FFA15A", "No Gu
 with t1:
     lite_cols = [c for c in df.columns if c.startswith("Lite_")]
     if lite_cols:
+        all_counts = answer_counts(df, lite_cols)
+        answered = set(all_counts.index.get_level_values("column"))
         cols = st.columns(3)
         for i, col_name in enumerate(lite_cols):
             feature_name = col_name.replace("Lite_", "").replace("_", " ")
-            clean_series = df[col_name].astype(str).str.strip()
-            clean_series = clean_series[clean_series.str.len() > 0]
-            clean_series = clean_series[~clean_series.str.lower().isin(["nan", "none"])]
-            if not clean_series.empty:
-                counts = clean_series.value_counts().reset_index()
+            if col_name in answered:
+                counts = all_counts.loc[col_name].reset_index()
                 counts.columns = ["Answer", "Count"]
                 fig = px.pie(counts, names="Answer", values="Count", title=f"<b>{feature_name}</b>",
                              color="Answer", color_discrete_map=color_map_lite, hole=0.4)
@@ -165,14 +169,13 @@ with t1:
 with t2:
     photo_cols = [c for c in df.columns if c.startswith("Photo_")]
     if photo_cols:
+        all_counts = answer_counts(df, photo_cols)
+        answered = set(all_counts.index.get_level_values("column"))
         cols = st.columns(3)
         for i, col_name in enumerate(photo_cols):
             feature_name = col_name.replace("Photo_", "").replace("_", " ")
-            clean_series = df[col_name].astype(str).str.strip()
-            clean_series = clean_series[clean_series.str.len() > 0]
-            clean_series = clean_series[~clean_series.str.lower().isin(["nan", "none"])]
-            if not clean_series.empty:
-                counts = clean_series.value_counts().reset_index()
+            if col_name in answered:
+                counts = all_counts.loc[col_name].reset_index()
                 counts.columns = ["Status", "Count"]
                 fig = px.pie(counts, names="Status", values="Count", title=f"<b>{feature_name}</b>", hole=0.4)
                 fig.update_traces(marker=dict(colors=["#00CC96" if "verified" in x.lower() else "#EF553B" if "compliant" in x.lower() else "#FFA15A" for x in counts["Status"]]))
@@ -199,7 +202,10 @@ with c_actions:
     st.markdown("#### Export Options")
     
     # 1. RAW DATA DOWNLOAD
-    csv_raw = df.to_csv(index=False).encode('utf-8')
+    # Built only when the button is clicked, not on every rerun
+    def csv_raw():
+        return df.to_csv(index=False).encode('utf-8')
+
     st.download_button(
         label="📥 Download Raw Data",
         data=csv_raw,
@@ -1,30 +1,12 @@
 import streamlit as st
 
+from faura_core import check_password
+
 # --- PAGE CONFIGURATION ---
 st.set_page_config(page_title="FAIR Plan Discount Calculator", layout="wide")
 
 # --- STANDARDIZED LOGIN BLOCK ---
-def check_password():
-    """Returns `True` if the user had the correct password."""
-    if st.session_state.get("password_correct", False):
-        return True
-
-    st.title("🔒 Faura Portfolio Map")
-    
-    with st.form("login_form"):
-        st.write("Please enter the access code to view the map.")
-        password = st.text_input("Password", type="password")
-        submitted = st.form_submit_button("Log In")
-        
-        if submitted:
-            if password == "Faura2026":
-                st.session_state["password_correct"] = True
-                st.rerun()
-            else:
-                st.error("😕 Password incorrect")
-    return False
-
-if not check_password():
+if not check_password("🔒 Faura Portfolio Map", "Please enter the access code to view the map."):
     st.stop()
 
 
@@ -2,33 +2,13 @@ import streamlit as st
 import pandas as pd
 import os
 
+from faura_core import check_password
+
 # --- 2. CONFIG & DATA LOADING ---
 st.set_page_config(page_title="Carrier Discount Calculator", layout="wide")
 
-# --- 2. STANDARDIZED LOGIN BLOCK (Copy this to all pages) ---
-def check_password():
-    """Returns `True` if the user had the correct password."""
-    # Check if the password is already correct in the session
-    if st.session_state.get("password_correct", False):
-        return True
-
-    # Show input in the MAIN AREA (not sidebar)
-    st.title("🔒 Faura Portfolio Map")
-    
-    with st.form("login_form"):
-        st.write("Please enter the access code to view the map.")
-        password = st.text_input("Password", type="password")
-        submitted = st.form_submit_button("Log In")
-        
-        if submitted:
-            if password == "Faura2026":
-                st.session_state["password_correct"] = True
-                st.rerun()
-            else:
-                st.error("😕 Password incorrect")
-    return False
-
-if not check_password():
+# --- 2. STANDARDIZED LOGIN BLOCK ---
+if not check_password("🔒 Faura Portfolio Map", "Please enter the access code to view the map."):
     st.stop()  # Stop execution if password is wrong
 
 
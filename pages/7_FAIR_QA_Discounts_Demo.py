@@ -2,31 +2,13 @@ import streamlit as st
 import pandas as pd
 import pydeck as pdk
 
+from faura_core import check_password
+
 # --- 1. PAGE CONFIG (MUST BE FIRST) ---
 st.set_page_config(layout="wide", page_title="Portfolio Savings Map")
 
 # --- 2. STANDARDIZED LOGIN BLOCK ---
-def check_password():
-    """Returns `True` if the user had the correct password."""
-    if st.session_state.get("password_correct", False):
-        return True
-
-    st.title("🔒 Faura Portfolio Map")
-    
-    with st.form("login_form"):
-        st.write("Please enter the access code to view the map.")
-        password = st.text_input("Password", type="password")
-        submitted = st.form_submit_button("Log In")
-        
-        if submitted:
-            if password == "Faura2026":
-                st.session_state["password_correct"] = True
-                st.rerun()
-            else:
-                st.error("😕 Password incorrect")
-    return False
-
-if not check_password():
+if not check_password("🔒 Faura Portfolio Map", "Please enter the access code to view the map."):
     st.stop()
 
 # --- 3. MAIN APP CONTENT ---